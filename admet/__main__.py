@@ -1,4 +1,15 @@
-from admet.worker import main
+import sys
+
+
+def main():
+    # `python -m admet screen ...` runs an offline batch screen; anything else
+    # starts the RabbitMQ worker as before.
+    if len(sys.argv) > 1 and sys.argv[1] == "screen":
+        from admet.screen import main as screen_main
+        sys.exit(screen_main(sys.argv[2:]))
+
+    from admet.worker import main as worker_main
+    worker_main()
 
 if __name__ == '__main__':
     main()
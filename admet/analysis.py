@@ -2,25 +2,15 @@
 
 from rdkit import Chem
 
-from .config import rule_based_catalog
+from .config import resolve_weight_profile, rule_based_catalog
+from .similarity import DOMAIN_DISTANCE_THRESHOLD
 from .utils import find_keys, to_probish
 
-def aggregate_risk(admet_preds, mol_desc, selected_parameters=None):
+def aggregate_risk(admet_preds, mol_desc, selected_parameters=None, weights=None):
     keymap = find_keys(admet_preds)
-    weights = {
-        "Ames": 25,
-        "DILI": 20,
-        "Hepatotoxicity": 10,
-        "hERG": 25,
-        "CYP2C9_inhib": 3,
-        "CYP2D6_inhib": 4,
-        "CYP3A4_inhib": 6,
-        "Pgp_inh": 3,
-        "BBB": -5,
-        "HIA": -5,
-        "Solubility": 6,
-    }
-    
+    if weights is None:
+        _, _, weights = resolve_weight_profile()
+
     # If selected_parameters are provided, filter the weights
     if selected_parameters:
         weights = {k: v for k, v in weights.items() if k in selected_parameters}
@@ -47,7 +37,7 @@ def aggregate_risk(admet_preds, mol_desc, selected_parameters=None):
         return 50.0, keymap
     return float(100.0 * total_score / total_weight), keymap
 
-def uncertainty_notes(mol, admet_preds, keymap):
+def uncertainty_notes(mol, admet_preds, keymap, domain=None):
     notes = []
     if mol is None:
         notes.append("SMILES parse edilemedi; tüm tahminler belirsiz.")
@@ -60,6 +50,12 @@ def uncertainty_notes(mol, admet_preds, keymap):
         notes.append(
             "Kiral merkezler mevcut; stereospesifik etkiler belirsizlik yaratabilir."
         )
+    distance = domain.get("distanceToTrainingSet") if domain else None
+    if distance is not None and distance > DOMAIN_DISTANCE_THRESHOLD:
+        notes.append(
+            f"Molekül referans eğitim setindeki en yakın komşularına uzak (mesafe {distance:.2f}); "
+            "tahminler modelin uygulanabilirlik alanının dışında olabilir."
+        )
     for tag, k in keymap.items():
         p = to_probish(admet_preds.get(k))
         if p is not None and 0.4 <= p <= 0.6:
@@ -1,5 +1,6 @@
 # admet/config.py
 
+import json
 import os
 from rdkit.Chem import FilterCatalog
 from admet_ai import ADMETModel
@@ -64,4 +65,100 @@ ALIAS = {
     "Solubility": ["solubility", "logs"],
     "VDss": ["vdss", "vd"],
     "hERG": ["herg"],
-}
\ No newline at end of file
+}
+
+# Risk-score weight profiles, keyed by name and then by version. Positive
+# weights penalize the predicted probability, negative weights reward it.
+# Never edit a published version in place: add a new one so stored scores
+# stay reproducible. Extra profiles can be supplied as JSON through
+# ADMET_WEIGHT_PROFILES_PATH (same shape, versions as string keys).
+DEFAULT_WEIGHT_PROFILE = "default"
+RISK_WEIGHT_PROFILES = {
+    "default": {
+        1: {
+            "Ames": 25,
+            "DILI": 20,
+            "Hepatotoxicity": 10,
+            "hERG": 25,
+            "CYP2C9_inhib": 3,
+            "CYP2D6_inhib": 4,
+            "CYP3A4_inhib": 6,
+            "Pgp_inh": 3,
+            "BBB": -5,
+            "HIA": -5,
+            "Solubility": 6,
+        },
+    },
+}
+
+_weight_profiles = None
+
+def _load_weight_profile_file(path, builtin):
+    """
+    Parses and validates a weight profile file. Raises ValueError on any
+    problem so that a bad file is rejected as a whole.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("top level must be an object of profile names")
+
+    loaded = {}
+    for name, versions in data.items():
+        if "@" in name or not isinstance(versions, dict):
+            raise ValueError(f"profile '{name}' must map versions to weights and contain no '@'")
+        for version, weights in versions.items():
+            try:
+                version = int(version)
+            except ValueError:
+                raise ValueError(f"profile '{name}' has non-integer version '{version}'")
+            if version in builtin.get(name, {}):
+                raise ValueError(f"{name}@{version} is a published built-in version and cannot be redefined")
+            if not isinstance(weights, dict) or not all(
+                isinstance(w, (int, float)) and not isinstance(w, bool) for w in weights.values()
+            ):
+                raise ValueError(f"{name}@{version} weights must be an object of numbers")
+            loaded.setdefault(name, {})[version] = weights
+    return loaded
+
+def get_weight_profiles():
+    """
+    Returns the built-in weight profiles merged with any loaded from
+    ADMET_WEIGHT_PROFILES_PATH, caching them after the first call.
+    """
+    global _weight_profiles
+    if _weight_profiles is not None:
+        return _weight_profiles
+
+    profiles = {name: dict(versions) for name, versions in RISK_WEIGHT_PROFILES.items()}
+    path = os.environ.get("ADMET_WEIGHT_PROFILES_PATH")
+    if path:
+        try:
+            loaded = _load_weight_profile_file(path, RISK_WEIGHT_PROFILES)
+        except Exception as e:
+            print(f"Warning: weight profiles could not be loaded from {path}; using built-ins only: {e}")
+        else:
+            for name, versions in loaded.items():
+                profiles.setdefault(name, {}).update(versions)
+            print(f"Weight profiles loaded from {path}.")
+
+    _weight_profiles = profiles
+    return _weight_profiles
+
+def resolve_weight_profile(profile: str | None = None):
+    """
+    Resolves "name" or "name@version" to (name, version, weights).
+    A bare name selects the latest version. Raises ValueError if unknown.
+    """
+    profiles = get_weight_profiles()
+    name, _, version = (profile or DEFAULT_WEIGHT_PROFILE).partition("@")
+    versions = profiles.get(name)
+    if not versions:
+        raise ValueError(f"Unknown weight profile: '{name}'.")
+    try:
+        version = int(version) if version else max(versions)
+    except ValueError:
+        raise ValueError(f"Invalid weight profile version: '{profile}'.")
+    if version not in versions:
+        raise ValueError(f"Unknown version {version} of weight profile '{name}'.")
+    return name, version, versions[version]
@@ -0,0 +1,220 @@
+# admet/inference.py
+"""ADMET-AI model loading and CPU inference tuning.
+
+The backend is selected with ADMET_INFERENCE_BACKEND:
+  - "eager":     the stock chemprop ensemble (default)
+  - "quantized": the same ensemble with nn.Linear layers dynamically
+                 quantized to int8
+
+Thread pools are pinned per process with ADMET_INTRA_OP_THREADS and
+ADMET_INTER_OP_THREADS (0 leaves PyTorch's default).
+
+Run `python -m admet.inference smoke` to check that every backend loads and
+predicts, and `python -m admet.inference compare molecules.smi` to check the
+quantized outputs against eager ones and benchmark both paths.
+
+There is no TorchScript/ONNX backend. chemprop's data loader builds a
+BatchMolGraph and passes it to MoleculeModel.forward(). The encoder's
+readout then loops in Python over the graph's a_scope, a list of
+(start, size) tuples that differs for every batch. Tracing would bake one
+batch's molecule sizes into the graph, and scripting cannot take the
+BatchMolGraph object. Only the tensor-only pieces (the ffn readout and the
+encoder's W_i/W_h/W_o layers) would export, leaving message passing and
+readout in eager Python anyway.
+"""
+
+import argparse
+import importlib.metadata
+import os
+import time
+
+import torch
+
+INFERENCE_BACKEND = os.environ.get("ADMET_INFERENCE_BACKEND", "eager").lower()
+INTRA_OP_THREADS = int(os.environ.get("ADMET_INTRA_OP_THREADS", "0"))
+INTER_OP_THREADS = int(os.environ.get("ADMET_INTER_OP_THREADS", "0"))
+BACKENDS = ("eager", "quantized")
+
+# Fix PyTorch weights_only issue for PyTorch 2.6+:
+# chemprop checkpoints are full pickles, so default weights_only to False.
+_original_torch_load = torch.load
+def _patched_torch_load(*args, **kwargs):
+    if 'weights_only' not in kwargs:
+        kwargs['weights_only'] = False
+    return _original_torch_load(*args, **kwargs)
+torch.load = _patched_torch_load
+
+
+def configure_threads(intra_op: int = INTRA_OP_THREADS, inter_op: int = INTER_OP_THREADS):
+    """Pins PyTorch's intra-op and inter-op thread pools for this process."""
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError as e:
+            # Can only be set once, before any inter-op parallel work starts.
+            print(f"Warning: inter-op threads already initialized: {e}")
+
+
+def _map_models(admet_model, fn):
+    """Applies fn to every chemprop model in the ensemble, in place.
+
+    ADMETModel keeps one list of MoleculeModels per task group in model_lists.
+    """
+    for models in admet_model.model_lists:
+        for j, model in enumerate(models):
+            models[j] = fn(model)
+
+
+def quantize_model(admet_model):
+    """Replaces the ensemble's Linear layers with dynamic int8 versions."""
+    _map_models(
+        admet_model,
+        lambda m: torch.ao.quantization.quantize_dynamic(m, {torch.nn.Linear}, dtype=torch.qint8).eval(),
+    )
+    return admet_model
+
+
+def model_version(backend: str = INFERENCE_BACKEND) -> str:
+    """Identifies the model build that produced a set of predictions."""
+    try:
+        version = importlib.metadata.version("admet-ai")
+    except importlib.metadata.PackageNotFoundError:
+        version = "unknown"
+    return f"admet-ai-{version}/{backend}"
+
+
+def load_admet_model(backend: str = INFERENCE_BACKEND, configure: bool = True, **model_kwargs):
+    """Loads the ADMET-AI ensemble prepared for the requested backend.
+
+    Extra keyword arguments are passed to ADMETModel.
+    """
+    from admet_ai import ADMETModel
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}'; expected one of {BACKENDS}.")
+    if configure:
+        configure_threads()
+
+    admet_model = ADMETModel(**model_kwargs)
+    _map_models(admet_model, lambda m: m.eval())
+    if backend == "quantized":
+        quantize_model(admet_model)
+    print(
+        f"ADMET-AI model ready (backend={backend}, intra-op threads={torch.get_num_threads()}, "
+        f"inter-op threads={torch.get_num_interop_threads()})."
+    )
+    return admet_model
+
+
+SMOKE_SMILES = ["CCO", "CC(=O)Oc1ccccc1C(=O)O", "CN1C=NC2=C1C(=O)N(C(=O)N2C)C"]
+
+
+def smoke_check(backends=BACKENDS):
+    """Loads every backend and checks it returns finite predictions."""
+    import numpy as np
+
+    for backend in backends:
+        admet_model = load_admet_model(backend, configure=False)
+        preds = admet_model.predict(smiles=SMOKE_SMILES)
+        values = preds.select_dtypes("number").to_numpy(dtype=float)
+        if len(preds) != len(SMOKE_SMILES) or values.size == 0 or not np.isfinite(values).all():
+            raise RuntimeError(f"Backend '{backend}' returned invalid predictions.")
+        print(f"Backend '{backend}' OK: {values.shape[1]} numeric outputs for {len(preds)} molecules.")
+
+
+def _timed_predict(admet_model, smiles, repeats):
+    # The first call warms up RDKit feature caches and allocator pools.
+    admet_model.predict(smiles=smiles)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        preds = admet_model.predict(smiles=smiles)
+        timings.append(time.perf_counter() - start)
+    return preds, min(timings)
+
+
+def compare(smiles: list[str], repeats: int = 3):
+    """Benchmarks eager vs quantized inference and reports output drift."""
+    import numpy as np
+
+    admet_model = load_admet_model("eager")
+    eager, eager_time = _timed_predict(admet_model, smiles, repeats)
+    quantize_model(admet_model)
+    quantized, quantized_time = _timed_predict(admet_model, smiles, repeats)
+
+    report = {"molecules": len(smiles), "columns": {}}
+    for column in eager.columns:
+        a = eager[column].to_numpy(dtype=float)
+        b = quantized[column].to_numpy(dtype=float)
+        diff = np.abs(a - b)
+        entry = {"max_abs_diff": float(np.nanmax(diff)), "mean_abs_diff": float(np.nanmean(diff))}
+        if np.nanmin(a) >= 0.0 and np.nanmax(a) <= 1.0:
+            entry["label_agreement"] = float(np.mean((a >= 0.5) == (b >= 0.5)))
+        report["columns"][column] = entry
+    report["eager_seconds"] = eager_time
+    report["quantized_seconds"] = quantized_time
+    report["speedup"] = eager_time / quantized_time if quantized_time else None
+    return report
+
+
+def main(argv=None):
+    from .utils import iter_molecule_file
+
+    parser = argparse.ArgumentParser(
+        prog="python -m admet.inference",
+        description="Smoke-test the inference backends, or check quantized outputs against eager ones.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("smoke", help="Load every backend and predict a few molecules.")
+    cmp = sub.add_parser("compare")
+    cmp.add_argument("path", help=".smi/.csv/.sdf file of benchmark molecules")
+    cmp.add_argument("--limit", type=int, default=500)
+    cmp.add_argument("--repeats", type=int, default=3)
+    cmp.add_argument(
+        "--max-abs-diff", type=float, default=0.05,
+        help="exit non-zero if any probability column drifts further than this",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "smoke":
+        smoke_check()
+        return
+
+    smiles = []
+    try:
+        for _, smi, mol in iter_molecule_file(args.path):
+            if mol is not None:
+                smiles.append(smi)
+            if len(smiles) >= args.limit:
+                break
+    except ValueError as e:
+        parser.error(str(e))
+    if not smiles:
+        parser.error(f"No valid molecules found in {args.path}")
+
+    report = compare(smiles, repeats=args.repeats)
+    print(f"{'column':<45} {'max |Δ|':>10} {'mean |Δ|':>10} {'agree':>7}")
+    worst = 0.0
+    for column, entry in report["columns"].items():
+        agree = entry.get("label_agreement")
+        print(
+            f"{column:<45} {entry['max_abs_diff']:>10.4f} {entry['mean_abs_diff']:>10.4f} "
+            f"{'' if agree is None else f'{agree:.3f}':>7}"
+        )
+        # Regression outputs live on their own scales, so only probability
+        # columns are held to the absolute tolerance.
+        if agree is not None:
+            worst = max(worst, entry["max_abs_diff"])
+    print(
+        f"\n{report['molecules']} molecules: eager {report['eager_seconds']:.3f}s, "
+        f"quantized {report['quantized_seconds']:.3f}s, speedup x{report['speedup']:.2f}"
+    )
+    if worst > args.max_abs_diff:
+        print(f"FAIL: probability drift {worst:.4f} exceeds {args.max_abs_diff}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,20 +3,14 @@
 import os
 import json
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from rdkit import RDLogger
-
-# Fix PyTorch weights_only issue for PyTorch 2.6+
-import torch
-# Monkey patch torch.load to use weights_only=False by default
-original_torch_load = torch.load
-def patched_torch_load(*args, **kwargs):
-    if 'weights_only' not in kwargs:
-        kwargs['weights_only'] = False
-    return original_torch_load(*args, **kwargs)
-torch.load = patched_torch_load
+from pydantic import BaseModel, Field
+from rdkit import Chem, RDLogger
 
+from .config import get_weight_profiles
 from .pipeline import run_analysis_pipeline
+from .scoring import rescore
+from .similarity import applicability_domain
+from .utils import smiles_to_mol
 
 # Suppress RDKit verbose logs
 RDLogger.DisableLog("rdApp.*")
@@ -38,6 +32,19 @@ class PredictionRequest(BaseModel):
     name: str | None = None
     smiles: str | None = None
     selected_parameters: list[str] | None = None
+    weight_profile: str | None = None
+
+
+class RescoreRequest(BaseModel):
+    weight_profile: str | None = None
+    selected_parameters: list[str] | None = None
+    smiles: list[str] | None = None
+    include_results: bool = False
+
+
+class SimilarityRequest(BaseModel):
+    smiles: str
+    k: int = Field(10, ge=1, le=100)
 
 
 @app.post("/predict")
@@ -46,7 +53,7 @@ async def predict_admet(request: PredictionRequest):
     
     # Create a cache key from SMILES and sorted parameters
     params_key = json.dumps(request.selected_parameters, sort_keys=True) if request.selected_parameters else "{}"
-    cache_key = f"{request.smiles}:{params_key}"
+    cache_key = f"{request.smiles}:{params_key}:{request.weight_profile or ''}"
 
     # Check cache first
     if cache_key in admet_cache:
@@ -61,7 +68,8 @@ async def predict_admet(request: PredictionRequest):
             name=request.name, 
             smiles=request.smiles, 
             selected_parameters=request.selected_parameters,
-            notify=False
+            notify=False,
+            weight_profile=request.weight_profile,
         )
         # Store result in cache
         admet_cache[cache_key] = result
@@ -78,6 +86,46 @@ async def predict_admet(request: PredictionRequest):
         )
 
 
+@app.get("/weight-profiles")
+def list_weight_profiles():
+    """List the available risk-score weight profiles by name and version."""
+    return {
+        name: {str(version): weights for version, weights in sorted(versions.items())}
+        for name, versions in get_weight_profiles().items()
+    }
+
+
+@app.post("/rescore")
+def rescore_predictions(request: RescoreRequest):
+    """Recompute risk scores, PK profiles and uncertainty notes from stored predictions."""
+    smiles = None
+    if request.smiles is not None:
+        smiles = []
+        for smi in request.smiles:
+            mol = smiles_to_mol(smi)
+            if mol is None:
+                raise HTTPException(status_code=400, detail=f"Invalid SMILES string: '{smi}'")
+            smiles.append(Chem.MolToSmiles(mol))
+    try:
+        return rescore(
+            request.weight_profile,
+            smiles=smiles,
+            include_results=request.include_results,
+            selected_parameters=request.selected_parameters,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/similar")
+async def similar_molecules(request: SimilarityRequest):
+    """Return already-analyzed molecules most similar to the given SMILES."""
+    mol = smiles_to_mol(request.smiles)
+    if mol is None:
+        raise HTTPException(status_code=400, detail=f"Invalid SMILES string: '{request.smiles}'")
+    return {"smiles": request.smiles, **applicability_domain(mol, k=request.k)}
+
+
 @app.get("/", tags=["General"])
 def read_root():
     """Root endpoint providing API status."""
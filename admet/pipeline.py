@@ -5,20 +5,29 @@ import requests
 import traceback
 from concurrent.futures import ThreadPoolExecutor
 
+from rdkit import Chem
+
 from .analysis import (
     aggregate_risk,
     run_rule_based_alerts,
     simplified_pk_profile,
     uncertainty_notes,
 )
-from admet_ai import ADMETModel
+from .config import resolve_weight_profile
+from .inference import load_admet_model, model_version
 from .queries import query_chembl, query_pubchem, name_to_smiles
+from .similarity import applicability_domain, get_analyzed_index, get_reference_index
+from .store import get_store
 from .utils import mol_to_base64_image, rdkit_descriptors, smiles_to_mol, find_keys
 
 # --- Model Pre-loading ---
 print("Loading ADMET-AI model...")
-admet_model = ADMETModel()
-print("ADMET-AI model loaded successfully.")
+admet_model = load_admet_model()
+MODEL_VERSION = model_version()
+# Open the similarity indexes up front, like the model, so the first request
+# does not pay for reading their metadata.
+get_reference_index()
+get_analyzed_index()
 # -------------------------
 
 # Import notify_backend from centralized module
@@ -32,6 +41,7 @@ def run_analysis_pipeline(
     type: str | None = None,       # Made optional
     selected_parameters: list[str] | None = None,
     notify: bool = True,           # New parameter
+    weight_profile: str | None = None,
 ):
     """Manages the entire analysis process and optionally notifies the backend."""
     if notify:
@@ -57,6 +67,8 @@ def run_analysis_pipeline(
     run_all = not selected_parameters
     
     try:
+        profile_name, profile_version, weights = resolve_weight_profile(weight_profile)
+
         # 1. Input Resolution and Molecule Preparation
         final_smiles = None
         molecule_name = name
@@ -88,10 +100,21 @@ def run_analysis_pipeline(
         if mol is None:
             raise ValueError("Failed to process the final molecule structure from SMILES.")
 
+        # Raw predictions are stored per canonical SMILES, so a molecule that
+        # was already analyzed with this model skips inference entirely.
+        canonical_smiles = Chem.MolToSmiles(mol)
+        stored_predictions = None
+        try:
+            stored_predictions = get_store().get_predictions(canonical_smiles, MODEL_VERSION)
+        except Exception as e:
+            print(f"Warning: prediction store lookup failed: {e}")
+
         # 2. Parallel Heavy Lifting
         results = {}
         with ThreadPoolExecutor(max_workers=3) as executor:
-            pred_future = executor.submit(admet_model.predict, smiles=final_smiles)
+            pred_future = None
+            if stored_predictions is None:
+                pred_future = executor.submit(admet_model.predict, smiles=final_smiles)
             
             # Conditionally run experimental data queries
             if run_all or PARAM_EXPERIMENTAL in selected_parameters:
@@ -100,7 +123,7 @@ def run_analysis_pipeline(
                 results["pubchem_data"] = pubchem_future.result()
                 results["chembl_data"] = chembl_future.result()
 
-            results["predictions"] = pred_future.result()
+            results["predictions"] = pred_future.result() if pred_future else stored_predictions
 
         predictions = results.get("predictions", {})
         pubchem_data = results.get("pubchem_data", {})
@@ -118,7 +141,9 @@ def run_analysis_pipeline(
             alerts = run_rule_based_alerts(mol)
 
         # Pass selected_parameters to aggregate_risk
-        risk_score, _ = aggregate_risk(predictions, descriptors, selected_parameters=selected_parameters)
+        risk_score, _ = aggregate_risk(
+            predictions, descriptors, selected_parameters=selected_parameters, weights=weights
+        )
 
         pk_profile = "Not calculated."
         # Check if any PK properties are selected, or if the general PK profile is selected
@@ -127,8 +152,13 @@ def run_analysis_pipeline(
             pk_profile = simplified_pk_profile(predictions, keymap)
 
         notes = "Not calculated."
+        domain = None
         if run_all or PARAM_UNCERTAINTY in selected_parameters:
-            notes = uncertainty_notes(mol, predictions, keymap)
+            try:
+                domain = applicability_domain(mol)
+            except Exception as e:
+                print(f"Warning: applicability-domain lookup failed: {e}")
+            notes = uncertainty_notes(mol, predictions, keymap, domain=domain)
 
         # 4. Format Results
         # Filter predictions based on keymap and selected_parameters
@@ -151,6 +181,7 @@ def run_analysis_pipeline(
             "image_base64": mol_to_base64_image(mol),
             "moleculeName": molecule_name,
             "riskScore": risk_score,
+            "weightProfile": f"{profile_name}@{profile_version}",
             "physChem": descriptors,
             "admetPredictions": [
                 {"property": prop, "prediction": str(val)}
@@ -159,9 +190,24 @@ def run_analysis_pipeline(
             "structuralAlerts": alerts,
             "pkProfile": pk_profile,
             "uncertaintyNotes": notes,
+            "applicabilityDomain": domain,
             "experimentalData": {"pubchem": pubchem_data, "chembl": chembl_data},
         }
 
+        try:
+            get_store().save_predictions(
+                [(canonical_smiles, molecule_name, predictions, domain)], MODEL_VERSION
+            )
+        except Exception as e:
+            print(f"Warning: could not persist predictions: {e}")
+
+        # Record the molecule only after the lookups above so it is never
+        # reported as its own neighbor.
+        try:
+            get_analyzed_index().add(mol, molecule_name)
+        except Exception as e:
+            print(f"Warning: could not add molecule to similarity index: {e}")
+
     except Exception as e:
         print(f"---! ADMET ANALYSIS FAILED for identifier: '{identifier or smiles}' !---")
         traceback.print_exc()
@@ -0,0 +1,110 @@
+# admet/scoring.py
+"""Re-scoring of stored predictions under named, versioned weight profiles.
+
+Risk scores, PK profiles and uncertainty notes are all derived from the raw
+ADMET-AI outputs, so a policy change only needs the predictions persisted in
+the store, not another round of inference.
+"""
+
+import argparse
+import json
+
+from .analysis import aggregate_risk, simplified_pk_profile, uncertainty_notes
+from .config import get_weight_profiles, resolve_weight_profile
+from .inference import model_version as current_model_version
+from .store import get_store
+from .utils import smiles_to_mol
+
+
+def score_predictions(mol, predictions, weights, domain=None, selected_parameters=None):
+    """Derives riskScore, pkProfile and uncertaintyNotes from raw predictions."""
+    risk_score, keymap = aggregate_risk(
+        predictions, {}, selected_parameters=selected_parameters, weights=weights
+    )
+    return {
+        "riskScore": risk_score,
+        "pkProfile": simplified_pk_profile(predictions, keymap),
+        "uncertaintyNotes": uncertainty_notes(mol, predictions, keymap, domain=domain),
+    }
+
+
+def rescore(
+    weight_profile: str | None = None,
+    smiles: list[str] | None = None,
+    model_version: str | None = None,
+    include_results: bool = False,
+    store=None,
+    selected_parameters: list[str] | None = None,
+):
+    """Recomputes and stores scores for every stored molecule (or the given
+    canonical SMILES) under a weight profile.
+
+    The store does not know which parameters the original /predict requests
+    selected, so scores cover the full weight panel unless selected_parameters
+    restricts them the same way /predict does. Each stored score is labeled
+    with its panel.
+    """
+    name, version, weights = resolve_weight_profile(weight_profile)
+    model_version = model_version or current_model_version()
+    store = store or get_store()
+
+    rescored = 0
+    results = []
+    for batch in store.iter_predictions(model_version, smiles=smiles):
+        records = []
+        for smi, molecule_name, predictions, domain in batch:
+            scored = score_predictions(
+                smiles_to_mol(smi), predictions, weights, domain=domain,
+                selected_parameters=selected_parameters,
+            )
+            records.append((smi, scored["riskScore"], scored["pkProfile"], scored["uncertaintyNotes"]))
+            if include_results:
+                results.append({"smiles": smi, "moleculeName": molecule_name, **scored})
+        store.save_scores(records, model_version, name, version, selected_parameters)
+        rescored += len(records)
+
+    summary = {
+        "weightProfile": f"{name}@{version}",
+        "modelVersion": model_version,
+        "selectedParameters": sorted(selected_parameters) if selected_parameters else None,
+        "rescored": rescored,
+    }
+    if include_results:
+        summary["results"] = results
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m admet.scoring",
+        description="Re-score stored predictions under a weight profile.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("profiles", help="List available weight profiles.")
+    run = sub.add_parser("rescore", help="Recompute scores for stored predictions.")
+    run.add_argument("--profile", help='"name" or "name@version"; defaults to the latest default profile')
+    run.add_argument("--model-version", help="model build whose predictions to use; defaults to the current one")
+    run.add_argument(
+        "--parameters", nargs="+", metavar="PARAM",
+        help="restrict the risk score to these parameters, as /predict's selected_parameters does; "
+             "defaults to the full panel",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "profiles":
+        for name, versions in sorted(get_weight_profiles().items()):
+            for version, weights in sorted(versions.items()):
+                print(f"{name}@{version}: {json.dumps(weights)}")
+        return
+
+    try:
+        summary = rescore(
+            args.profile, model_version=args.model_version, selected_parameters=args.parameters
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+# admet/screen.py
+"""Offline batch screening: `python -m admet screen compounds.smi -o out/`.
+
+The input is standardized and de-duplicated once, then split into shard files
+under the output directory. Each shard runs in a worker process and is written
+to its own Parquet/Arrow file with an atomic rename, so the finished result
+file doubles as the shard's checkpoint and re-running the same command resumes
+a killed job at the first unfinished shard.
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from rdkit import Chem, RDLogger
+from rdkit.Chem.MolStandardize import rdMolStandardize
+
+from .utils import iter_molecule_file
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+MANIFEST = "manifest.json"
+# Columns whose type cannot always be inferred from a single shard (all-null
+# names, empty alert lists); pinned so every shard file shares one schema.
+COLUMN_TYPES = {
+    "index": "int64",
+    "name": "string",
+    "input_smiles": "string",
+    "smiles": "string",
+    "distance_to_training_set": "float64",
+    "uncertainty_notes": "list<string>",
+    "structural_alerts": "list<string>",
+}
+
+_uncharger = None
+
+
+def standardize(mol):
+    """Cleans up a molecule, keeps its parent fragment and neutralizes it."""
+    global _uncharger
+    if _uncharger is None:
+        _uncharger = rdMolStandardize.Uncharger()
+    mol = rdMolStandardize.Cleanup(mol)
+    mol = rdMolStandardize.FragmentParent(mol)
+    return _uncharger.uncharge(mol)
+
+
+def _input_fingerprint(path):
+    stat = os.stat(path)
+    return {"input": os.path.abspath(path), "input_size": stat.st_size, "input_mtime": stat.st_mtime}
+
+
+def _shard_path(out_dir, shard):
+    return os.path.join(out_dir, "shards", f"shard-{shard:05d}.jsonl")
+
+
+def _result_path(out_dir, shard, fmt):
+    return os.path.join(out_dir, "results", f"shard-{shard:05d}{FORMATS[fmt]}")
+
+
+def plan(args):
+    """Standardizes, de-duplicates and shards the input; returns the manifest.
+
+    An existing manifest is reused as long as it was built from the same
+    input with the same settings.
+    """
+    manifest_path = os.path.join(args.output, MANIFEST)
+    settings = {
+        **_input_fingerprint(args.input),
+        "shard_size": args.shard_size,
+        "format": args.format,
+        "backend": args.backend,
+        "weight_profile": args.weight_profile,
+        "domain": args.domain,
+    }
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        changed = [k for k, v in settings.items() if manifest.get(k) != v]
+        if changed:
+            raise SystemExit(
+                f"{args.output} holds a screen with different settings ({', '.join(changed)}); "
+                "use a new output directory."
+            )
+        print(f"Resuming screen: {manifest['molecules']} molecules in {manifest['shards']} shards.")
+        return manifest
+
+    os.makedirs(os.path.join(args.output, "shards"), exist_ok=True)
+    os.makedirs(os.path.join(args.output, "results"), exist_ok=True)
+
+    # Canonical SMILES -> input index of the record that was kept.
+    seen = {}
+    total = rejected = duplicates = shards = 0
+    buffer = []
+
+    def flush():
+        nonlocal shards, buffer
+        with open(_shard_path(args.output, shards), "w", encoding="utf-8") as f:
+            for record in buffer:
+                f.write(json.dumps(record) + "\n")
+        shards += 1
+        buffer = []
+
+    try:
+        records = enumerate(iter_molecule_file(args.input))
+        first = next(records, None)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    records = itertools.chain([first] if first else [], records)
+
+    with open(os.path.join(args.output, "rejected.jsonl"), "w", encoding="utf-8") as rejects, \
+            open(os.path.join(args.output, "duplicates.jsonl"), "w", encoding="utf-8") as dupes:
+        for index, (name, input_smiles, mol) in records:
+            total += 1
+            smiles = None
+            if mol is not None:
+                try:
+                    smiles = Chem.MolToSmiles(standardize(mol))
+                except Exception:
+                    smiles = None
+            if not smiles:
+                rejected += 1
+                rejects.write(json.dumps({"index": index, "name": name, "input_smiles": input_smiles}) + "\n")
+                continue
+            if smiles in seen:
+                duplicates += 1
+                dupes.write(json.dumps({
+                    "index": index,
+                    "name": name,
+                    "input_smiles": input_smiles,
+                    "smiles": smiles,
+                    "duplicate_of_index": seen[smiles],
+                }) + "\n")
+                continue
+            seen[smiles] = index
+            buffer.append({"index": index, "name": name, "input_smiles": input_smiles, "smiles": smiles})
+            if len(buffer) >= args.shard_size:
+                flush()
+    if buffer:
+        flush()
+
+    manifest = {
+        **settings,
+        "records": total,
+        "molecules": len(seen),
+        "duplicates": duplicates,
+        "rejected": rejected,
+        "shards": shards,
+    }
+    # Written last and atomically: a manifest only exists once every shard
+    # input file is complete.
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    print(
+        f"Planned screen: {total} records, {len(seen)} unique molecules in {shards} shards "
+        f"({duplicates} duplicates, {rejected} rejected)."
+    )
+    return manifest
+
+
+# --- Worker process state ---
+_model = None
+_model_version = None
+_weights = None
+_store = None
+
+
+def _init_worker(backend, threads, shard_size, weight_profile, use_store):
+    global _model, _model_version, _weights, _store
+    RDLogger.DisableLog("rdApp.*")
+    from .config import resolve_weight_profile
+    from .inference import configure_threads, load_admet_model, model_version
+
+    # Each process gets its own slice of the cores instead of every process
+    # spawning a full-size thread pool.
+    configure_threads(intra_op=threads, inter_op=1)
+    # A worker sees each molecule once, so ADMET-AI's per-SMILES Mol/MolGraph
+    # cache would only grow with the input. Its fingerprint pool would fork
+    # cpu_count processes from this torch-initialized process and ignore the
+    # thread budget, so keep every shard below its threshold.
+    _model = load_admet_model(
+        backend,
+        configure=False,
+        cache_molecules=False,
+        fingerprint_multiprocessing_min=shard_size + 1,
+    )
+    _model_version = model_version(backend)
+    _, _, _weights = resolve_weight_profile(weight_profile)
+    if use_store:
+        from .store import get_store
+        _store = get_store()
+
+
+def _run_shard(shard_file, result_file, fmt, with_domain):
+    import pyarrow as pa
+
+    from .config import rule_based_catalog
+    from .scoring import score_predictions
+    from .similarity import applicability_domain
+    from .utils import rdkit_descriptors, smiles_to_mol
+
+    with open(shard_file, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+
+    predictions = _model.predict(smiles=[r["smiles"] for r in records]).to_dict(orient="records")
+    if len(predictions) != len(records):
+        raise RuntimeError(f"Expected {len(records)} predictions, got {len(predictions)}.")
+
+    rows, stored = [], []
+    for record, preds in zip(records, predictions):
+        mol = smiles_to_mol(record["smiles"])
+        domain = None
+        if with_domain:
+            domain = applicability_domain(mol, include_analyzed=False)
+        scored = score_predictions(mol, preds, _weights, domain=domain)
+        row = {
+            **record,
+            "risk_score": scored["riskScore"],
+            "pk_profile": scored["pkProfile"],
+            "uncertainty_notes": scored["uncertaintyNotes"],
+            "structural_alerts": [m.GetDescription() for m in rule_based_catalog.GetMatches(mol)],
+        }
+        if with_domain:
+            row["distance_to_training_set"] = domain["distanceToTrainingSet"]
+        row.update(rdkit_descriptors(mol))
+        row.update(preds)
+        rows.append(row)
+        stored.append((record["smiles"], record["name"], preds, domain))
+
+    table = pa.Table.from_pylist(rows)
+    types = {
+        "int64": pa.int64(), "string": pa.string(), "float64": pa.float64(),
+        "list<string>": pa.list_(pa.string()),
+    }
+    table = table.cast(pa.schema([
+        pa.field(f.name, types[COLUMN_TYPES[f.name]]) if f.name in COLUMN_TYPES else f
+        for f in table.schema
+    ]))
+    # Dot-prefixed so pyarrow datasets skip it if a worker dies mid-write.
+    result_dir, result_name = os.path.split(result_file)
+    tmp_file = os.path.join(result_dir, f".{result_name}.tmp")
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, tmp_file, compression="zstd")
+    else:
+        with pa.OSFile(tmp_file, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_file, result_file)
+
+    if _store is not None:
+        _store.save_predictions(stored, _model_version)
+    return len(rows)
+
+
+def run(args):
+    manifest = plan(args)
+    pending = [
+        shard for shard in range(manifest["shards"])
+        if not os.path.exists(_result_path(args.output, shard, args.format))
+    ]
+    done = manifest["shards"] - len(pending)
+    if not pending:
+        print(f"All {manifest['shards']} shards already complete; results in {args.output}/results.")
+        return 0
+    if done:
+        print(f"{done} shards already complete, {len(pending)} remaining.")
+
+    workers = max(1, min(args.workers, len(pending)))
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    print(f"Screening with {workers} worker processes x {threads} threads ({args.backend} backend).")
+
+    # Spawn rather than fork: forking after torch has started its thread
+    # pools can deadlock the children.
+    context = multiprocessing.get_context("spawn")
+    failed = processed = 0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(args.backend, threads, args.shard_size, args.weight_profile, args.store),
+    ) as executor:
+        futures = {
+            executor.submit(
+                _run_shard,
+                _shard_path(args.output, shard),
+                _result_path(args.output, shard, args.format),
+                args.format,
+                args.domain,
+            ): shard
+            for shard in pending
+        }
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                count = future.result()
+                done += 1
+                processed += count
+                rate = processed / max(time.perf_counter() - start, 1e-9)
+                print(f"[{done}/{manifest['shards']}] shard {shard:05d}: {count} molecules (~{rate:.1f} mol/s)")
+            except Exception as e:
+                failed += 1
+                print(f"---! Shard {shard:05d} failed: {e} !---")
+
+    if failed:
+        print(f"{failed} shards failed; re-run the same command to retry them.")
+        return 1
+    print(f"Screen complete; results in {args.output}/results.")
+    return 0
+
+
+def main(argv=None):
+    from .config import DEFAULT_WEIGHT_PROFILE
+    from .inference import BACKENDS, INFERENCE_BACKEND
+
+    parser = argparse.ArgumentParser(
+        prog="python -m admet screen",
+        description="Screen a SMILES/CSV/SDF compound file offline with checkpointed, sharded workers.",
+    )
+    parser.add_argument("input", help=".smi, .csv or .sdf compound file")
+    parser.add_argument("-o", "--output", required=True, help="output directory (reused to resume)")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="parquet")
+    parser.add_argument("--shard-size", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--threads", type=int, default=0, help="torch threads per worker (default: cores / workers)")
+    parser.add_argument("--backend", choices=BACKENDS, default=INFERENCE_BACKEND)
+    parser.add_argument("--weight-profile", default=DEFAULT_WEIGHT_PROFILE)
+    parser.add_argument("--domain", action="store_true", help="add distance to the reference similarity index")
+    parser.add_argument("--store", action="store_true", help="also persist raw predictions for later re-scoring")
+    args = parser.parse_args(argv)
+
+    if args.shard_size <= 0:
+        parser.error("--shard-size must be positive")
+    if not os.path.exists(args.input):
+        parser.error(f"Input file not found: {args.input}")
+    try:
+        from .config import resolve_weight_profile
+        name, version, _ = resolve_weight_profile(args.weight_profile)
+    except ValueError as e:
+        parser.error(str(e))
+    # Pin the version so a resumed screen cannot mix profile versions.
+    args.weight_profile = f"{name}@{version}"
+
+    RDLogger.DisableLog("rdApp.*")
+    return run(args)
@@ -0,0 +1,377 @@
+# admet/similarity.py
+"""Fingerprint similarity index for applicability-domain checks.
+
+Morgan fingerprints are bit-packed into uint64 words and appended to a flat
+binary file that is memory-mapped for search, so Tanimoto top-k over millions
+of molecules is a handful of vectorized NumPy passes instead of RDKit loops.
+"""
+
+import argparse
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within a process.
+    fcntl = None
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import rdFingerprintGenerator
+
+from .utils import iter_molecule_file, smiles_to_mol
+
+SIMILARITY_DIR = os.environ.get(
+    "ADMET_SIMILARITY_DIR", os.path.join(os.environ.get("ADMET_DATA_DIR", "data"), "similarity")
+)
+FP_RADIUS = 2
+FP_BITS = 2048
+# Rows scanned per vectorized pass; bounds temporary memory during search.
+SEARCH_CHUNK_ROWS = 1 << 18
+# Mean top-k distance to the reference set above which a molecule is
+# considered outside the models' applicability domain.
+DOMAIN_DISTANCE_THRESHOLD = 0.7
+DOMAIN_NEIGHBORS = 5
+
+_fp_generator = rdFingerprintGenerator.GetMorganGenerator(radius=FP_RADIUS, fpSize=FP_BITS)
+
+if hasattr(np, "bitwise_count"):
+    def _row_popcount(words):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.uint32)
+else:
+    _BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _row_popcount(words):
+        as_bytes = words.view(np.uint8).reshape(words.shape[0], -1)
+        return _BYTE_POPCOUNT[as_bytes].sum(axis=1, dtype=np.uint32)
+
+
+def morgan_fingerprint(mol):
+    """Returns the bit-packed Morgan fingerprint of a molecule as uint64 words."""
+    bits = _fp_generator.GetFingerprintAsNumPy(mol).astype(bool, copy=False)
+    return np.packbits(bits).view(np.uint64)
+
+
+class FingerprintIndex:
+    """Append-only, memory-mapped store of packed fingerprints.
+
+    On disk an index is a directory holding:
+      - fingerprints.bin: uint64 rows of FP_BITS / 64 words each
+      - popcounts.bin:    uint16 bit count per row
+      - molecules.jsonl:  one {"smiles", "name"} record per row
+      - .lock:            flock target serializing appends across processes
+
+    Several processes (the API, `python -m admet.similarity add`, screening
+    workers) may share an index, so appends hold an exclusive file lock and
+    readers pick up rows appended elsewhere by re-reading the metadata tail.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.n_words = FP_BITS // 64
+        self._fp_path = os.path.join(path, "fingerprints.bin")
+        self._count_path = os.path.join(path, "popcounts.bin")
+        self._mol_path = os.path.join(path, "molecules.jsonl")
+        self._lock_path = os.path.join(path, ".lock")
+        self._lock = threading.Lock()
+        self._smiles: list[str] = []
+        self._names: list[str | None] = []
+        self._row_by_smiles: dict[str, int] = {}
+        self._mol_offset = 0
+        self._fingerprints = None
+        self._popcounts = None
+        os.makedirs(path, exist_ok=True)
+        with self._lock, self._file_lock():
+            self._recover()
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._smiles)
+
+    @contextmanager
+    def _file_lock(self):
+        with open(self._lock_path, "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _recover(self):
+        """Brings the three files back in line after a killed append.
+
+        Rows are written binary-first, so a process that dies mid-append
+        leaves extra fingerprint rows and/or a partial metadata line past the
+        last complete row. Catches up on the metadata (parsing only the unread
+        tail) and truncates every file to that row count, so the next append
+        lands on the right row. Must hold both the thread and the file lock.
+        """
+        open(self._mol_path, "ab").close()
+        self._refresh()
+        row_bytes = self.n_words * 8
+        fp_rows = os.path.getsize(self._fp_path) // row_bytes if os.path.exists(self._fp_path) else 0
+        count_rows = os.path.getsize(self._count_path) // 2 if os.path.exists(self._count_path) else 0
+        if len(self._smiles) > min(fp_rows, count_rows):
+            # Metadata ahead of the fingerprints cannot come from a torn
+            # append; drop the rows that have no fingerprint.
+            self._drop_rows_from(min(fp_rows, count_rows))
+        count = len(self._smiles)
+        with open(self._fp_path, "ab") as f:
+            f.truncate(count * row_bytes)
+        with open(self._count_path, "ab") as f:
+            f.truncate(count * 2)
+        with open(self._mol_path, "ab") as f:
+            f.truncate(self._mol_offset)
+
+    def _drop_rows_from(self, count):
+        offset = 0
+        with open(self._mol_path, "rb") as f:
+            for _ in range(count):
+                offset += len(f.readline())
+        del self._smiles[count:], self._names[count:]
+        self._row_by_smiles = {s: i for s, i in self._row_by_smiles.items() if i < count}
+        self._mol_offset = offset
+
+    def _refresh(self):
+        """Loads metadata rows appended since the last call, by this or any
+        other process. Must hold the thread lock."""
+        if os.path.getsize(self._mol_path) == self._mol_offset:
+            return
+        with open(self._mol_path, "rb") as f:
+            f.seek(self._mol_offset)
+            tail = f.read()
+        # A trailing line without its newline is still being written, or was
+        # torn by a killed appender; _recover() truncates the latter.
+        tail = tail[:tail.rfind(b"\n") + 1]
+        if not tail:
+            return
+        try:
+            # One parse for the whole tail is several times faster than one
+            # json.loads per line when opening a large index.
+            records = json.loads(b"[" + tail[:-1].replace(b"\n", b",") + b"]")
+            consumed = len(tail)
+        except json.JSONDecodeError:
+            records, consumed = [], 0
+            for line in tail.splitlines(keepends=True):
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+                consumed += len(line)
+        for record in records:
+            self._row_by_smiles.setdefault(record["smiles"], len(self._smiles))
+            self._smiles.append(record["smiles"])
+            self._names.append(record.get("name"))
+        self._mol_offset += consumed
+
+    def _arrays(self):
+        """Returns (fingerprints, popcounts) memory maps covering every row."""
+        self._refresh()
+        count = len(self._smiles)
+        if count == 0:
+            return None, None
+        if self._fingerprints is None or self._fingerprints.shape[0] != count:
+            self._fingerprints = np.memmap(
+                self._fp_path, dtype=np.uint64, mode="r", shape=(count, self.n_words)
+            )
+            self._popcounts = np.memmap(self._count_path, dtype=np.uint16, mode="r", shape=(count,))
+        return self._fingerprints, self._popcounts
+
+    def contains(self, smiles: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return smiles in self._row_by_smiles
+
+    def add_many(self, records):
+        """Appends (name, mol) pairs, skipping structures already indexed.
+
+        Returns the number of rows added.
+        """
+        candidates = []
+        for name, mol in records:
+            if mol is not None:
+                candidates.append((Chem.MolToSmiles(mol), name, mol))
+
+        with self._lock, self._file_lock():
+            # Another process may have appended since we last looked, or died
+            # mid-append; row numbers are positional, so catch up and trim any
+            # leftover rows before writing.
+            self._recover()
+            pending, fps, seen = [], [], set()
+            for smiles, name, mol in candidates:
+                if smiles in self._row_by_smiles or smiles in seen:
+                    continue
+                seen.add(smiles)
+                pending.append((smiles, name))
+                fps.append(morgan_fingerprint(mol))
+            if not pending:
+                return 0
+
+            fp_block = np.vstack(fps)
+            with open(self._fp_path, "ab") as f:
+                f.write(fp_block.tobytes())
+            with open(self._count_path, "ab") as f:
+                f.write(_row_popcount(fp_block).astype(np.uint16).tobytes())
+            with open(self._mol_path, "ab") as f:
+                f.write("".join(
+                    json.dumps({"smiles": smiles, "name": name}) + "\n" for smiles, name in pending
+                ).encode("utf-8"))
+            self._refresh()
+        return len(pending)
+
+    def add(self, mol, name: str | None = None) -> bool:
+        return self.add_many([(name, mol)]) == 1
+
+    def search(self, mol, k: int = 10, exclude_self: bool = True):
+        """Returns the k most Tanimoto-similar indexed molecules, best first."""
+        if mol is None or k <= 0:
+            return []
+        with self._lock:
+            fingerprints, popcounts = self._arrays()
+            self_row = self._row_by_smiles.get(Chem.MolToSmiles(mol)) if exclude_self else None
+            smiles, names = self._smiles, self._names
+        if fingerprints is None:
+            return []
+
+        query = morgan_fingerprint(mol)
+        query_count = int(_row_popcount(query[np.newaxis, :])[0])
+        best_rows = np.empty(0, dtype=np.int64)
+        best_sims = np.empty(0, dtype=np.float32)
+        for start in range(0, fingerprints.shape[0], SEARCH_CHUNK_ROWS):
+            block = fingerprints[start:start + SEARCH_CHUNK_ROWS]
+            common = _row_popcount(block & query)
+            union = popcounts[start:start + block.shape[0]].astype(np.uint32) + query_count - common
+            sims = np.divide(
+                common, union, out=np.zeros(block.shape[0], dtype=np.float32), where=union > 0
+            )
+            if self_row is not None and start <= self_row < start + block.shape[0]:
+                sims[self_row - start] = -1.0
+            if block.shape[0] > k:
+                top = np.argpartition(sims, -k)[-k:]
+            else:
+                top = np.arange(block.shape[0])
+            best_rows = np.concatenate([best_rows, top + start])
+            best_sims = np.concatenate([best_sims, sims[top]])
+            if best_rows.shape[0] > k:
+                keep = np.argpartition(best_sims, -k)[-k:]
+                best_rows, best_sims = best_rows[keep], best_sims[keep]
+
+        order = np.argsort(-best_sims)
+        return [
+            {
+                "smiles": smiles[row],
+                "name": names[row],
+                "similarity": round(float(sim), 4),
+            }
+            for row, sim in zip(best_rows[order], best_sims[order])
+            if sim >= 0
+        ]
+
+
+# Indexes are opened lazily, like the ChEMBL client, so importing this module
+# never touches the filesystem.
+_indexes: dict[str, FingerprintIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_index(name: str) -> FingerprintIndex:
+    """Returns the named index ("reference" or "analyzed"), opening it on first use."""
+    with _indexes_lock:
+        if name not in _indexes:
+            _indexes[name] = FingerprintIndex(os.path.join(SIMILARITY_DIR, name))
+        return _indexes[name]
+
+def get_reference_index() -> FingerprintIndex:
+    return get_index("reference")
+
+def get_analyzed_index() -> FingerprintIndex:
+    return get_index("analyzed")
+
+def applicability_domain(mol, k: int = DOMAIN_NEIGHBORS, include_analyzed: bool = True):
+    """Summarizes how close a molecule is to the reference (training) set.
+
+    distanceToTrainingSet is 1 - mean Tanimoto similarity of the k nearest
+    reference neighbors, or None when no reference set has been loaded.
+    """
+    neighbors = get_reference_index().search(mol, k=k, exclude_self=False)
+    distance = None
+    if neighbors:
+        distance = round(1.0 - float(np.mean([n["similarity"] for n in neighbors])), 4)
+    domain = {"distanceToTrainingSet": distance, "nearestReferenceNeighbors": neighbors}
+    if include_analyzed:
+        domain["similarAnalyzed"] = get_analyzed_index().search(mol, k=k)
+    return domain
+
+
+def selfcheck():
+    """Regression check for torn appends: an append after a killed appender
+    left a stray fingerprint row must still land on its own metadata row."""
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as path:
+        index = FingerprintIndex(path)
+        index.add_many([("ethanol", smiles_to_mol("CCO")), ("benzene", smiles_to_mol("c1ccccc1"))])
+
+        # Simulate a process killed between the binary and metadata writes.
+        stray = morgan_fingerprint(smiles_to_mol("c1ccncc1"))[np.newaxis, :]
+        with open(index._fp_path, "ab") as f:
+            f.write(stray.tobytes())
+        with open(index._count_path, "ab") as f:
+            f.write(_row_popcount(stray).astype(np.uint16).tobytes())
+        with open(index._mol_path, "ab") as f:
+            f.write(b'{"smiles": "c1cc')
+
+        decane = smiles_to_mol("CCCCCCCCCC")
+        index.add(decane, "decane")
+        for checked in (index, FingerprintIndex(path)):
+            hit = checked.search(decane, k=1, exclude_self=False)
+            if len(checked) != 3 or not hit or hit[0]["smiles"] != "CCCCCCCCCC" or hit[0]["similarity"] != 1.0:
+                raise RuntimeError(f"Similarity index misaligned after torn append: {hit}")
+    print("Similarity index self-check passed.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m admet.similarity", description="Manage fingerprint similarity indexes."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="Add molecules from a .smi/.csv/.sdf file to an index.")
+    add.add_argument("path")
+    add.add_argument("--index", choices=["reference", "analyzed"], default="reference")
+    search = sub.add_parser("search", help="Print the nearest neighbors of a SMILES string.")
+    search.add_argument("smiles")
+    search.add_argument("--index", choices=["reference", "analyzed"], default="analyzed")
+    search.add_argument("-k", type=int, default=10)
+    sub.add_parser("selfcheck", help="Check that torn appends are recovered without misaligning rows.")
+    args = parser.parse_args(argv)
+
+    if args.command == "selfcheck":
+        selfcheck()
+        return
+
+    index = get_index(args.index)
+    if args.command == "add":
+        batch, added = [], 0
+        try:
+            for name, _, mol in iter_molecule_file(args.path):
+                batch.append((name, mol))
+                if len(batch) >= 10000:
+                    added += index.add_many(batch)
+                    batch = []
+        except ValueError as e:
+            parser.error(str(e))
+        added += index.add_many(batch)
+        print(f"Added {added} molecules; {args.index} index now holds {len(index)}.")
+    else:
+        mol = smiles_to_mol(args.smiles)
+        if mol is None:
+            parser.error(f"Invalid SMILES: {args.smiles}")
+        print(json.dumps(index.search(mol, k=args.k), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# admet/store.py
+"""Persistent store of raw ADMET-AI predictions and derived scores.
+
+Raw model outputs are kept per canonical SMILES so that risk scores can be
+recomputed under new weight profiles without re-running inference.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+STORE_PATH = os.environ.get(
+    "ADMET_STORE_PATH", os.path.join(os.environ.get("ADMET_DATA_DIR", "data"), "predictions.sqlite3")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    smiles TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    name TEXT,
+    predictions TEXT NOT NULL,
+    domain TEXT,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (smiles, model_version)
+);
+CREATE TABLE IF NOT EXISTS scores (
+    smiles TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    profile TEXT NOT NULL,
+    profile_version INTEGER NOT NULL,
+    -- Sorted JSON list of the parameters the score was restricted to, or
+    -- 'full' for the full weight panel.
+    panel TEXT NOT NULL,
+    risk_score REAL NOT NULL,
+    pk_profile TEXT,
+    uncertainty_notes TEXT,
+    computed_at REAL NOT NULL,
+    PRIMARY KEY (smiles, model_version, profile, profile_version, panel)
+);
+"""
+
+
+class PredictionStore:
+    """SQLite-backed store; each call opens its own connection so the store is
+    safe to share between API threads and screening processes."""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(scores)")}
+            if columns and "panel" not in columns:
+                # Scores from before panels were recorded cannot be labeled;
+                # they are derived data, so drop them and re-score.
+                conn.execute("DROP TABLE scores")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def save_predictions(self, records, model_version: str):
+        """Upserts (smiles, name, predictions, domain) records."""
+        now = time.time()
+        rows = [
+            (
+                smiles,
+                model_version,
+                name,
+                json.dumps(predictions, default=float),
+                json.dumps(domain) if domain is not None else None,
+                now,
+            )
+            for smiles, name, predictions, domain in records
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO predictions (smiles, model_version, name, predictions, domain, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (smiles, model_version) DO UPDATE SET "
+                "name = COALESCE(excluded.name, name), predictions = excluded.predictions, "
+                "domain = COALESCE(excluded.domain, domain), updated_at = excluded.updated_at",
+                rows,
+            )
+
+    def get_predictions(self, smiles: str, model_version: str):
+        """Returns the stored raw predictions for a molecule, or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT predictions FROM predictions WHERE smiles = ? AND model_version = ?",
+                (smiles, model_version),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def iter_predictions(self, model_version: str, smiles: list[str] | None = None, batch_size: int = 5000):
+        """Yields batches of (smiles, name, predictions, domain) records."""
+        with self._connect() as conn:
+            if smiles is None:
+                cursor = conn.execute(
+                    "SELECT smiles, name, predictions, domain FROM predictions "
+                    "WHERE model_version = ? ORDER BY smiles",
+                    (model_version,),
+                )
+            else:
+                conn.execute("CREATE TEMP TABLE wanted (smiles TEXT PRIMARY KEY)")
+                conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((s,) for s in smiles))
+                cursor = conn.execute(
+                    "SELECT p.smiles, p.name, p.predictions, p.domain FROM predictions p "
+                    "JOIN wanted w ON w.smiles = p.smiles WHERE p.model_version = ? ORDER BY p.smiles",
+                    (model_version,),
+                )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [
+                    (s, name, json.loads(preds), json.loads(domain) if domain else None)
+                    for s, name, preds, domain in rows
+                ]
+
+    def save_scores(
+        self, records, model_version: str, profile: str, profile_version: int,
+        selected_parameters: list[str] | None = None,
+    ):
+        """Upserts (smiles, risk_score, pk_profile, uncertainty_notes) records.
+
+        selected_parameters labels the panel the scores were restricted to;
+        None means the full weight panel.
+        """
+        panel = json.dumps(sorted(selected_parameters)) if selected_parameters else "full"
+        now = time.time()
+        rows = [
+            (smiles, model_version, profile, profile_version, panel, risk_score, pk_profile, json.dumps(notes), now)
+            for smiles, risk_score, pk_profile, notes in records
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scores (smiles, model_version, profile, profile_version, panel, "
+                "risk_score, pk_profile, uncertainty_notes, computed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+
+_store = None
+
+def get_store() -> PredictionStore:
+    """Returns the shared prediction store, opening it on first use."""
+    global _store
+    if _store is None:
+        _store = PredictionStore()
+    return _store
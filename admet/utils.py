@@ -1,7 +1,9 @@
 # admet/utils.py
 
 import base64
+import csv
 import math
+import os
 from io import BytesIO
 
 from rdkit import Chem
@@ -38,6 +40,44 @@ def to_probish(x):
 def smiles_to_mol(smiles: str):
     return Chem.MolFromSmiles(smiles)
 
+def iter_molecule_file(path: str):
+    """Yields (name, smiles, mol) tuples from a .sdf, .smi/.txt or .csv file.
+
+    CSV files need a header with a "smiles" column (any case); an optional
+    "name" column is used for names. Unparseable records are yielded with mol=None so callers can report them.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".sdf":
+        supplier = Chem.SDMolSupplier(path)
+        for i, mol in enumerate(supplier):
+            name = mol.GetProp("_Name") if mol is not None and mol.HasProp("_Name") else None
+            smiles = Chem.MolToSmiles(mol) if mol is not None else None
+            yield name or f"record-{i}", smiles, mol
+        return
+
+    with open(path, newline="", encoding="utf-8") as f:
+        if ext == ".csv":
+            reader = csv.DictReader(f)
+            columns = {c.strip().lower(): c for c in reader.fieldnames or []}
+            if "smiles" not in columns:
+                raise ValueError(f"No 'smiles' column found in the header of {path}.")
+            smiles_col, name_col = columns["smiles"], columns.get("name")
+            for row in reader:
+                smiles = (row.get(smiles_col) or "").strip()
+                name = (row.get(name_col) or "").strip() if name_col else ""
+                yield name or None, smiles, smiles_to_mol(smiles) if smiles else None
+            return
+
+        for i, line in enumerate(f):
+            row = line.split(None, 1)
+            if not row or row[0].startswith("#"):
+                continue
+            smiles = row[0].strip()
+            if i == 0 and smiles.lower() == "smiles":
+                continue
+            name = row[1].strip() if len(row) > 1 and row[1].strip() else None
+            yield name, smiles, smiles_to_mol(smiles)
+
 def mol_to_base64_image(mol, size=(350, 250)):
     if mol is None:
         return None
@@ -39,7 +39,8 @@ def main():
                                 json={
                                     "name": task_data.get('name'),
                                     "smiles": task_data.get('smiles'),
-                                    "selected_parameters": task_data.get('selected_parameters')
+                                    "selected_parameters": task_data.get('selected_parameters'),
+                                    "weight_profile": task_data.get('weight_profile')
                                 }
                             )
                             api_response.raise_for_status() # Raise an exception for bad status codes